@@ -1,50 +1,59 @@
+import io
 import logging
-from datetime import date, datetime
-from ipaddress import ip_address
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
 import geopandas as gpd
+import orjson
 import pandas as pd
-import requests
-from aimlsse_api.data.metar import (MetarPandas, MetarProperty,
-                                    MetarPropertyType)
-from dacite import from_dict
-from shapely import Point, Polygon
+from aimlsse_api.data.metar import MetarPandas, MetarProperty
+from aimlsse_api.util.time import to_millis
+from shapely import Polygon
 
 from .web_client import WebClient
 
 
 class GroundDataClient (WebClient):
-
-    def __init__(self, ip_address: ip_address, port: int) -> None:
-        super().__init__(ip_address, port)
-        self.logger = logging.getLogger(f'{__name__}.{self.__class__.__name__}')
     """
     Provides access to station based data of the ground-measurements data-source
 
     Hides communication with the service that implements `aimlsse_api.interface.GroundDataAccess` from the user
     """
+    METADATA_CACHE_SIZE = 32
+
+    def __init__(self, ip_address:WebClient.IPAddress, port:int, **kwargs) -> None:
+        super().__init__(ip_address, port, **kwargs)
+        self.logger = logging.getLogger(f'{__name__}.{self.__class__.__name__}')
+        self._metadata_cache: Dict[bytes, Tuple[str, gpd.GeoDataFrame]] = {}
 
     def queryMetar(self, datetime_from:datetime, datetime_to:datetime, properties:List[MetarProperty],
-        stations:Optional[List[str]] = None, polygons:Optional[List[Polygon]] = None) -> pd.DataFrame:
+        stations:Optional[List[str]] = None, polygons:Optional[List[Polygon]] = None,
+        query_id:Optional[str] = None) -> pd.DataFrame:
         """
         Query data for the specified stations in the interval [datetime_from, datetime_to],
         where the properties are extracted from the METARs.
 
         Specify a list of stations, polygons or both for the query.
+
+        If `pyarrow` is installed, the data is requested as an Arrow IPC stream, falling back to JSON
+        when the service does not support it.
         
         Parameters
         ----------
         datetime_from: `datetime.datetime`
-            The beginning of the interval to be queried
+            The beginning of the interval to be queried, naive datetimes are interpreted as UTC
         datetime_to: `datetime.datetime`
-            The end of the interval to be queried
+            The end of the interval to be queried, naive datetimes are interpreted as UTC
         properties: `List[MetarProperty]`
             The properties to extract from the METARs
         stations: `Optional[List[str]]`
             A list containing all stations that the data should be queried for
         polygons: `Optional[List[Polygon]]`
             A list of polygons that specify the area to search for stations
+        query_id: `Optional[str]`
+            An identifier for queries of the same properties, which allows the service to reuse
+            the prepared statement of the query - e.g. when querying the same properties for many intervals
         
         Returns
         -------
@@ -52,29 +61,106 @@ class GroundDataClient (WebClient):
             The METAR data that is queried from the data source for the given datetime-interval
             (station, datetime, ..requested properties..)
         """
-        if stations is None and polygons is None:
-            raise ValueError('No stations or polygons were given. Specify at least one of them.')
-        data_json_out = {
-            'properties': [str(prop) for prop in properties]
-        }
-        if stations:
-            data_json_out['stations'] = stations
-        if polygons:
-            data_json_out['polygons'] = [str(x) for x in polygons]
+        data_json_out = self._metar_request(properties, stations, polygons)
         self.logger.debug(data_json_out)
-        query_response = requests.post(f'{self.base_url}/queryMetar',
-            params={'datetime_from': datetime_from, 'datetime_to': datetime_to}, json=data_json_out, stream=True)
-        query_response.raise_for_status()
-        data = pd.read_json(query_response.text, orient='table')
-        data['datetime'] = pd.to_datetime(data['datetime'])
-        data = MetarPandas.format_dataframe(data, properties)
+        params = {'datetime_from': to_millis(datetime_from), 'datetime_to': to_millis(datetime_to)}
+        if query_id is not None:
+            params['query_id'] = query_id
+        # Closing the streamed response returns the connection to the pool, even if the request failed
+        with self.session.post(self._url('queryMetar'), params=params,
+            **self._json_body(data_json_out, self._accept_arrow()), stream=True, timeout=self.timeout
+        ) as query_response:
+            query_response.raise_for_status()
+            if self._is_arrow(query_response):
+                data = self._read_arrow(query_response).to_pandas()
+            else:
+                data = pd.read_json(io.BytesIO(query_response.content), orient='table')
+        return self._format_metar(data, properties)
+
+    def queryMetarBatch(self, queries:List[dict]) -> List[pd.DataFrame]:
+        """
+        Run multiple METAR queries, where all queries of the same datetime-interval are sent to the service at once.
+
+        The service answers the queries of each datetime-interval with a single query of its data source,
+        so prefer this over `queryMetarConcurrent` for many queries that share their datetime-interval,
+        e.g. the same interval for multiple groups of stations.
+        
+        Parameters
+        ----------
+        queries: `List[dict]`
+            The keyword arguments of each query, as accepted by `queryMetar` - `query_id` is ignored
+        
+        Returns
+        -------
+        `List[pandas.DataFrame]`
+            The METAR data of each query, in the order of the queries
+        """
+        if not queries:
+            raise ValueError('No queries were given. Specify at least one of them.')
+        intervals: Dict[Tuple[datetime, datetime], List[int]] = {}
+        for index, query in enumerate(queries):
+            intervals.setdefault((query['datetime_from'], query['datetime_to']), []).append(index)
+        results: List[Optional[pd.DataFrame]] = [None] * len(queries)
+        for (datetime_from, datetime_to), indices in intervals.items():
+            requests_out = [{
+                'batch_id': str(index),
+                **self._metar_request(queries[index]['properties'], queries[index].get('stations'),
+                    queries[index].get('polygons'))
+            } for index in indices]
+            self.logger.debug(requests_out)
+            with self.session.post(self._url('queryMetarBatch'),
+                params={'datetime_from': to_millis(datetime_from), 'datetime_to': to_millis(datetime_to)},
+                **self._json_body(requests_out), stream=True, timeout=self.timeout
+            ) as query_response:
+                query_response.raise_for_status()
+                batches = orjson.loads(query_response.content)
+            batch_ids = {request['batch_id']: index for request, index in zip(requests_out, indices)}
+            for batch in batches:
+                index = batch_ids.pop(batch['batch_id'], None)
+                if index is None:
+                    raise ValueError(f'The service answered the unknown or repeated batch_id {batch["batch_id"]!r}.')
+                results[index] = self._format_metar(self._read_table(batch['data']), queries[index]['properties'])
+            if batch_ids:
+                raise ValueError(f'The service did not answer the batch_ids {list(batch_ids)}.')
+        return results
+
+    def queryMetarConcurrent(self, queries:List[dict], max_workers:Optional[int] = None) -> pd.DataFrame:
+        """
+        Run multiple METAR queries concurrently over the connections of this client and combine their results.
+
+        Useful for splitting a large query into slices of stations or datetime-intervals,
+        for queries that share their datetime-interval see `queryMetarBatch`.
+        
+        Parameters
+        ----------
+        queries: `List[dict]`
+            The keyword arguments of each query, as accepted by `queryMetar`
+        max_workers: `Optional[int]`
+            The number of queries that run at the same time, limited to the size of the connection pool
+        
+        Returns
+        -------
+        `pandas.DataFrame`
+            The METAR data of all queries, concatenated in the order of the queries
+        """
+        if not queries:
+            raise ValueError('No queries were given. Specify at least one of them.')
+        max_workers = min(max_workers or self.pool_maxsize, self.pool_maxsize)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(lambda query: self.queryMetar(**query), queries))
+        data = pd.concat(results, ignore_index=True)
+        # Categories differ between the queries, so concat falls back to objects
+        data['station'] = data['station'].astype('category')
         return data
-    
+
     def queryMetadata(self, stations:Optional[List[str]] = None, polygons:Optional[List[Polygon]] = None):
         """
         Query metadata for the specified stations in the interval [date_from, date_to]
 
         Specify a list of stations, polygons or both for the query.
+
+        If the service tags the metadata with an `ETag`, repeated queries only revalidate the known metadata
+        instead of transferring it again.
         
         Parameters
         ----------
@@ -94,10 +180,64 @@ class GroundDataClient (WebClient):
         if stations:
             data_json_out['stations'] = stations
         if polygons:
-            data_json_out['polygons'] = [str(x) for x in polygons]
+            name, encoded = self._geometry_field('polygons', polygons)
+            data_json_out[name] = encoded
         self.logger.debug(data_json_out)
-        query_response = requests.post(f'{self.base_url}/queryMetadata', json=data_json_out)
+        # Metadata rarely changes, so the service is only asked whether the known version is still valid
+        cache_key = orjson.dumps(data_json_out)
+        cached = self._metadata_cache.get(cache_key)
+        body = self._json_body(orjson.Fragment(cache_key))
+        if cached is not None:
+            body['headers']['If-None-Match'] = cached[0]
+        query_response = self.session.post(self._url('queryMetadata'), **body, timeout=self.timeout)
+        if cached is not None and query_response.status_code == 304:
+            return cached[1].copy()
         query_response.raise_for_status()
-        data_json = query_response.json()
-        geo_data = gpd.GeoDataFrame.from_features(data_json)
+        geo_data = self._read_features(query_response)
+        etag = query_response.headers.get('ETag')
+        if etag is not None:
+            if len(self._metadata_cache) >= self.METADATA_CACHE_SIZE:
+                self._metadata_cache.pop(next(iter(self._metadata_cache)))
+            self._metadata_cache[cache_key] = (etag, geo_data.copy())
         return geo_data
+
+    def _metar_request(self, properties:List[MetarProperty], stations:Optional[List[str]],
+        polygons:Optional[List[Polygon]]) -> dict:
+        """
+        The data of a METAR query, as expected by the service
+        """
+        if stations is None and polygons is None:
+            raise ValueError('No stations or polygons were given. Specify at least one of them.')
+        data_json_out = {
+            'properties': [str(prop) for prop in properties]
+        }
+        if stations:
+            data_json_out['stations'] = stations
+        if polygons:
+            name, encoded = self._geometry_field('polygons', polygons)
+            data_json_out[name] = encoded
+        return data_json_out
+
+    def _read_table(self, table:dict) -> pd.DataFrame:
+        """
+        Builds the DataFrame of an already parsed JSON document in the 'table' orientation of pandas,
+        leaving the typing of the columns to `_format_metar`
+        """
+        schema = table['schema']
+        data = pd.DataFrame(table['data'], columns=[field['name'] for field in schema['fields']])
+        primary_key = schema.get('primaryKey')
+        if primary_key:
+            data = data.set_index(primary_key)
+            if data.index.names == ['index']:
+                data.index.name = None
+        return data
+
+    def _format_metar(self, data:pd.DataFrame, properties:List[MetarProperty]) -> pd.DataFrame:
+        """
+        Types the columns of the METAR data that is received from the service
+        """
+        # The table schema usually types the column already
+        if not pd.api.types.is_datetime64_any_dtype(data['datetime']):
+            data['datetime'] = pd.to_datetime(data['datetime'], format='ISO8601')
+        data['station'] = data['station'].astype('category')
+        return MetarPandas.format_dataframe(data, properties)
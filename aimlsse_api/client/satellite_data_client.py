@@ -1,19 +1,36 @@
 import datetime
-import json
 import os
 import re
-from typing import List, Optional, Union
+import shutil
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 import geopandas as gpd
+import orjson
 import pandas as pd
 import requests
 from aimlsse_api.data import Credentials
 from aimlsse_api.data.status import QueryStates
-from requests.auth import HTTPBasicAuth
+from aimlsse_api.util.time import to_millis
+from requests.auth import AuthBase, HTTPBasicAuth
 from shapely import Geometry, Point, Polygon
 
 from . import WebClient
 
+_FILENAME_RE = re.compile(r'filename="([^"]+)"')
+
+
+class _BearerAuth(AuthBase):
+
+    def __init__(self, token:str) -> None:
+        self.token = token
+
+    def __call__(self, request:requests.PreparedRequest) -> requests.PreparedRequest:
+        request.headers['Authorization'] = f'Bearer {self.token}'
+        return request
+
 
 class SatelliteDataClient (WebClient):
     """
@@ -22,10 +39,42 @@ class SatelliteDataClient (WebClient):
     Hides communication with the service that implements `aimlsse_api.interface.SatelliteDataAccess` from the user
     """
 
+    def __init__(self, ip_address:WebClient.IPAddress, port:int, **kwargs) -> None:
+        super().__init__(ip_address, port, **kwargs)
+        self._tokens: Dict[Tuple[str, str], _BearerAuth] = {}
+        self._tokens_lock = threading.Lock()
+
+    def login(self, copernicus_login:Credentials) -> str:
+        """
+        Logs in at the service with the given credentials.
+
+        Returns the token of the session, which authorizes further requests of the user.
+        Tokens are obtained and renewed automatically by the methods that require a login.
+        
+        Parameters
+        ----------
+        copernicus_login: `Credentials`
+            The login information for the copernicus hub
+        
+        Returns
+        -------
+        `str`
+            The token of the session
+        """
+        query_response = self.session.post(self._url('login'),
+            auth=HTTPBasicAuth(copernicus_login.username, copernicus_login.password),
+            timeout=self.timeout
+        )
+        query_response.raise_for_status()
+        return orjson.loads(query_response.content)['token']
+
     def queryContainingGeometry(self, locations:gpd.GeoDataFrame) -> gpd.GeoDataFrame:
         """
         Query the geometry that together contain the provided locations
 
+        If `pyarrow` is installed, the geometry is requested as an Arrow IPC stream, falling back to GeoJSON
+        when the service does not support it.
+
         Parameters
         ----------
         locations: `geopandas.GeoDataFrame`
@@ -36,11 +85,16 @@ class SatelliteDataClient (WebClient):
         `geopandas.GeoDataFrame`
             The geometry that together contain the provided locations
         """
-        locations_json = json.loads(locations.to_json())
-        query_response = requests.post(f'{self.base_url}/queryContainingGeometry', json=locations_json)
-        query_response.raise_for_status()
-        geometry_json = query_response.json()
-        return gpd.GeoDataFrame.from_features(geometry_json['features'])
+        if len(locations) == 0:
+            return gpd.GeoDataFrame(geometry=[], crs=locations.crs)
+        with self.session.post(self._url('queryContainingGeometry'),
+            **self._json_body(orjson.Fragment(locations.to_json()), self._accept_arrow()),
+            stream=True, timeout=self.timeout
+        ) as query_response:
+            query_response.raise_for_status()
+            if self._is_arrow(query_response):
+                return self._read_arrow_features(query_response)
+            return self._read_features(query_response)
 
     def queryProductsMetadata(self, datetime_from:datetime.datetime, datetime_to:datetime.datetime,
         copernicus_login:Credentials, footprint:Optional[Union[Point, Polygon]] = None,
@@ -55,9 +109,9 @@ class SatelliteDataClient (WebClient):
         Parameters
         ----------
         datetime_from: `datetime.datetime`
-            The beginning of the interval to be queried
+            The beginning of the interval to be queried, naive datetimes are interpreted as UTC
         datetime_to: `datetime.datetime`
-            The end of the interval to be queried
+            The end of the interval to be queried, naive datetimes are interpreted as UTC
         copernicus_login: `Credentials`
             The login information for the copernicus hub
         footprint: `Union[Point, Polygon]`
@@ -72,22 +126,74 @@ class SatelliteDataClient (WebClient):
         """
         json_out = {}
         if footprint is not None:
-            json_out['footprint'] = footprint.wkt
+            name, encoded = self._geometry_field('footprint', footprint)
+            json_out[name] = encoded
         elif cell_name is not None:
             json_out['cell_name'] = cell_name
         else:
             raise ValueError('It is required to specify either the footprint or the cell_name!')
-        query_response = requests.post(f'{self.base_url}/queryProductsMetadata',
+        with self._send_authorized('POST', self._url('queryProductsMetadata'), copernicus_login,
             params={
-                'datetime_from': datetime_from,
-                'datetime_to': datetime_to
+                'datetime_from': to_millis(datetime_from),
+                'datetime_to': to_millis(datetime_to)
             },
-            json=json_out,
-            auth=HTTPBasicAuth(copernicus_login.username, copernicus_login.password),
-            stream=True
-        )
-        query_response.raise_for_status()
-        return pd.DataFrame(query_response.json())
+            **self._json_body(json_out),
+            stream=True,
+            timeout=self.timeout
+        ) as query_response:
+            query_response.raise_for_status()
+            data_json = orjson.loads(query_response.content)
+        return self._read_products(data_json)
+
+    def queryProductsMetadataBatch(self, datetime_from:datetime.datetime, datetime_to:datetime.datetime,
+        copernicus_login:Credentials, footprints:List[Union[Point, Polygon]]) -> List[pd.DataFrame]:
+        """
+        Query products for multiple footprints from the specified datetime-interval [datetime_from, datetime_to]
+        with a single request, which the service answers with a single query to the copernicus hub
+        
+        Parameters
+        ----------
+        datetime_from: `datetime.datetime`
+            The beginning of the interval to be queried, naive datetimes are interpreted as UTC
+        datetime_to: `datetime.datetime`
+            The end of the interval to be queried, naive datetimes are interpreted as UTC
+        copernicus_login: `Credentials`
+            The login information for the copernicus hub
+        footprints: `List[Union[Point, Polygon]]`
+            The point or polygon areas of interest
+
+        Returns
+        -------
+        `List[pandas.DataFrame]`
+            The products of each footprint, in the order of the footprints
+        """
+        if not footprints:
+            return []
+        name, encoded = self._geometry_field('footprint', footprints)
+        with self._send_authorized('POST', self._url('queryProductsMetadataBatch'), copernicus_login,
+            params={
+                'datetime_from': to_millis(datetime_from),
+                'datetime_to': to_millis(datetime_to)
+            },
+            **self._json_body([
+                {'batch_id': str(index), name: footprint}
+                for index, footprint in enumerate(encoded)
+            ]),
+            stream=True,
+            timeout=self.timeout
+        ) as query_response:
+            query_response.raise_for_status()
+            batches = orjson.loads(query_response.content)
+        results: List[Optional[pd.DataFrame]] = [None] * len(footprints)
+        batch_ids = {str(index): index for index in range(len(footprints))}
+        for batch in batches:
+            index = batch_ids.pop(batch['batch_id'], None)
+            if index is None:
+                raise ValueError(f'The service answered the unknown or repeated batch_id {batch["batch_id"]!r}.')
+            results[index] = self._read_products(batch['products'])
+        if batch_ids:
+            raise ValueError(f'The service did not answer the batch_ids {list(batch_ids)}.')
+        return results
     
     def requestProduct(self, id:str, copernicus_login:Credentials) -> QueryStates:
         """
@@ -107,16 +213,74 @@ class SatelliteDataClient (WebClient):
         `QueryStates`
             The state of the request
         """
-        query_response = requests.get(f'{self.base_url}/requestProduct',
+        query_response = self._send_authorized('GET', self._url('requestProduct'), copernicus_login,
             params={
                 'id': id
             },
-            auth=HTTPBasicAuth(copernicus_login.username, copernicus_login.password)
+            timeout=self.timeout
         )
         query_response.raise_for_status()
-        data_json = query_response.json()
+        data_json = orjson.loads(query_response.content)
         return QueryStates(data_json['state'])
 
+    def requestProducts(self, ids:List[str], copernicus_login:Credentials,
+        max_workers:Optional[int] = 8) -> List[QueryStates]:
+        """
+        Makes requests for all products with the specified ids concurrently for the user with the given credentials.
+
+        Returns the status of each request.
+        
+        Parameters
+        ----------
+        ids: `List[str]`
+            The ids of the products to be requested
+        copernicus_login: `Credentials`
+            The login information for the copernicus hub
+        max_workers: `Optional[int]`
+            The number of requests that run at the same time, limited to the size of the connection pool
+        
+        Returns
+        -------
+        `List[QueryStates]`
+            The states of the requests, in the order of the ids
+        """
+        with ThreadPoolExecutor(max_workers=min(max_workers or self.pool_maxsize, self.pool_maxsize)) as executor:
+            return list(executor.map(lambda id: self.requestProduct(id, copernicus_login), ids))
+
+    def streamProductState(self, id:str, copernicus_login:Credentials) -> Iterator[QueryStates]:
+        """
+        Observes the state of the product with the specified id for the user with the given credentials,
+        without polling the service.
+
+        Yields the current state and every change of it, until the service ends the stream on a final state.
+        Waiting for the next change is not subject to the read timeout of this client.
+        
+        Parameters
+        ----------
+        id: `str`
+            The id of the product to be observed
+        copernicus_login: `Credentials`
+            The login information for the copernicus hub
+        
+        Yields
+        ------
+        `QueryStates`
+            The states of the product, as they are reached
+        """
+        with self._send_authorized('GET', self._url('streamProductState'), copernicus_login,
+            params={
+                'id': id
+            },
+            headers={'Accept': 'text/event-stream'},
+            stream=True,
+            timeout=(self.timeout[0], None)
+        ) as query_response:
+            query_response.raise_for_status()
+            for line in query_response.iter_lines():
+                # Other fields and comments, e.g. keep-alive pings, carry no state
+                if line.startswith(b'data:'):
+                    yield QueryStates(orjson.loads(line[5:])['state'])
+
     def extractFeatures(self, id:str, radius:float, bands:List[str], locations:gpd.GeoDataFrame,
         out_dir:str) -> str:
         """
@@ -145,24 +309,27 @@ class SatelliteDataClient (WebClient):
         `str`
             The path to the downloaded zip-file of the extracted features
         """
-        os.makedirs(out_dir, exist_ok=True)
+        self._ensure_dir(out_dir)
         filepath = os.path.join(out_dir, f'{id}.zip')
-        with requests.post(f'{self.base_url}/extractFeatures',
+        if len(locations) == 0:
+            # Nothing to extract, store an empty archive without asking the service
+            zipfile.ZipFile(filepath, 'w').close()
+            return filepath
+        with self.session.post(self._url('extractFeatures'),
             params={
                 'id': id,
                 'radius': radius
             },
-            json={
+            **self._json_body({
                 'bands': bands,
-                'locations': json.loads(locations.to_json()),
+                'locations': orjson.Fragment(locations.to_json()),
                 'crs': str(locations.crs)
-            },
-            stream=True
+            }, {'Accept-Encoding': 'identity'}),
+            stream=True,
+            timeout=self.timeout
         ) as response:
             response.raise_for_status()
-            with open(filepath, 'wb') as file:
-                for chunk in response.iter_content(512 * 1024):
-                    file.write(chunk)
+            self._download(response, filepath)
         return filepath
 
     def getProduct(self, id:str, out_dir:str):
@@ -183,21 +350,135 @@ class SatelliteDataClient (WebClient):
         `str`
             The path to the downloaded zip-file of the extracted features
         """
-        os.makedirs(out_dir, exist_ok=True)
-        with requests.get(f'{self.base_url}/getProduct',
+        self._ensure_dir(out_dir)
+        with self.session.get(self._url('getProduct'),
             params={
                 'id': id,
-            }
+            },
+            headers={'Accept-Encoding': 'identity'},
+            stream=True,
+            timeout=self.timeout
         ) as response:
             response.raise_for_status()
-            disposition_str = 'content-disposition'
-            if disposition_str in response.headers:
-                disposition = response.headers[disposition_str]
-                filename = re.findall("filename=\"(.+)\"", disposition)[0]
-            else:
-                filename = f'{id}.zip'
+            match = _FILENAME_RE.search(response.headers.get('content-disposition', ''))
+            filename = match.group(1) if match else f'{id}.zip'
             filepath = os.path.join(out_dir, filename)
-            with open(filepath, 'wb') as file:
-                for chunk in response.iter_content(512 * 1024):
-                    file.write(chunk)
-        return filepath
\ No newline at end of file
+            self._download(response, filepath)
+        return filepath
+
+    def getProductRange(self, id:str, offset:int, length:int) -> bytes:
+        """
+        Requests a range of bytes of the full product with the specified id,
+        e.g. to read a single band file from the zip-file without downloading all of it.
+        
+        Parameters
+        ----------
+        id: `str`
+            The id of the product to be requested
+        offset: `int`
+            The position of the first byte in the zip-file
+        length: `int`
+            The number of bytes to be requested
+        
+        Returns
+        -------
+        `bytes`
+            The bytes in the range [offset, offset + length) of the zip-file of the product
+        """
+        query_response = self.session.get(self._url('getProductRange'),
+            params={
+                'id': id,
+                'offset': offset,
+                'length': length
+            },
+            headers={'Accept-Encoding': 'identity'},
+            timeout=self.timeout
+        )
+        query_response.raise_for_status()
+        return query_response.content
+
+    def getProducts(self, ids:List[str], out_dir:str, max_workers:Optional[int] = 8) -> List[str]:
+        """
+        Requests the full products with the specified ids concurrently.
+
+        Returns the zip-files of the products.
+        
+        Parameters
+        ----------
+        ids: `List[str]`
+            The ids of the products to be requested
+        out_dir: `str`
+            The directory in which to store the incoming data
+        max_workers: `Optional[int]`
+            The number of downloads that run at the same time, limited to the size of the connection pool
+        
+        Returns
+        -------
+        `List[str]`
+            The paths to the downloaded zip-files of the products, in the order of the ids
+        """
+        with ThreadPoolExecutor(max_workers=min(max_workers or self.pool_maxsize, self.pool_maxsize)) as executor:
+            return list(executor.map(lambda id: self.getProduct(id, out_dir), ids))
+
+    def _auth_for(self, copernicus_login:Credentials, expired:Optional[_BearerAuth] = None) -> _BearerAuth:
+        """
+        The authorization by the token of the user, logging in only if no token is known yet
+        or the known one is the expired token - concurrent callers wait for a single login
+        """
+        key = (copernicus_login.username, copernicus_login.password)
+        with self._tokens_lock:
+            auth = self._tokens.get(key)
+            if auth is None or auth is expired:
+                auth = self._tokens[key] = _BearerAuth(self.login(copernicus_login))
+            return auth
+
+    def _send_authorized(self, method:str, url:str, copernicus_login:Credentials, **kwargs) -> requests.Response:
+        """
+        Sends a request on behalf of the user, logging in again once if the session of the token has expired
+        """
+        auth = self._auth_for(copernicus_login)
+        response = self.session.request(method, url, auth=auth, **kwargs)
+        if response.status_code == 401:
+            response.close()
+            response = self.session.request(method, url, auth=self._auth_for(copernicus_login, expired=auth), **kwargs)
+        return response
+
+    def _read_products(self, data_json) -> pd.DataFrame:
+        """
+        Builds the products from their metadata, as received from the service
+        """
+        if isinstance(data_json, dict) and 'columns' in data_json:
+            # Column-wise 'split' orientation
+            return pd.DataFrame(data_json['data'], index=data_json.get('index'), columns=data_json['columns'])
+        return pd.DataFrame(data_json)
+
+    def _download(self, response:requests.Response, filepath:str) -> None:
+        """
+        Copies the body of a streamed response into the file at the given path,
+        reading directly from the connection in blocks of 4 MiB
+
+        If the size of the body is known, the file is allocated upfront to avoid fragmentation on disk.
+        Where supported, the kernel is told that the file is written sequentially.
+
+        Parameters
+        ----------
+        response: `requests.Response`
+            The streamed response to be downloaded
+        filepath: `str`
+            The path of the file to write to
+        """
+        length = int(response.headers.get('Content-Length', 0))
+        response.raw.decode_content = True
+        fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o666)
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        with os.fdopen(fd, 'wb', buffering=1024 * 1024) as file:
+            if length > 0 and hasattr(os, 'posix_fallocate'):
+                try:
+                    os.posix_fallocate(file.fileno(), 0, length)
+                except OSError:
+                    # Not supported by every filesystem
+                    pass
+            shutil.copyfileobj(response.raw, file, length=4 * 1024 * 1024)
+            # Drop the preallocated space that was not written, e.g. if the body was encoded
+            file.truncate()
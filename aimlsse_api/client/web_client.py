@@ -1,20 +1,195 @@
+import gzip
+import io
 import ipaddress
+import os
 from abc import ABC
-from typing import Union
+from typing import List, Optional, Set, Tuple, Union
+
+import geopandas as gpd
+import numpy as np
+import orjson
+import requests
+import shapely
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+try:
+    import pyogrio
+except ImportError:
+    pyogrio = None
 
 
 class WebClient(ABC):
     IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+    ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+    COMPRESSION_THRESHOLD = 64 * 1024
 
-    def __init__(self, ip_address:IPAddress, port:int) -> None:
+    def __init__(self, ip_address:IPAddress, port:int, pool_maxsize:int = 20,
+        timeout:Tuple[float, Optional[float]] = (5.0, None), compress_requests:bool = False,
+        wkb_geometry:bool = False) -> None:
         """
         Uses the provided ip-address and port to access a service that implements the corresponding interface
 
+        All requests are issued through a single `requests.Session`, so connections to the service are kept alive
+        and reused between calls. Use the client as a context manager or call `close` to release them.
+
         Parameters
         ----------
         ip_address: `AllowedIPAddress`
             The ip-address under which the service is available
         port: `int`
             The port under which the service is available
+        pool_maxsize: `int`
+            The maximum number of connections that are kept alive to the service
+        timeout: `Tuple[float, Optional[float]]` [s]
+            The timeouts for connecting to the service and for waiting on data from it -
+            the latter is unlimited by default, since queries over large intervals or many locations
+            may take long before the service responds
+        compress_requests: `bool`
+            Whether JSON bodies larger than `COMPRESSION_THRESHOLD` bytes are sent gzip-compressed,
+            which requires the service to accept `Content-Encoding: gzip` on requests
+        wkb_geometry: `bool`
+            Whether geometry is sent as hex-encoded well-known binary (wkb) instead of well-known text (wkt),
+            which is smaller and faster to parse, but requires the service to accept the `.._wkb` parameters
+        """
+        self.base_url = f"http://{ip_address}:{port}"
+        self._urls = {}
+        self._known_dirs: Set[str] = set()
+        self.timeout = timeout
+        self.pool_maxsize = pool_maxsize
+        self.compress_requests = compress_requests
+        self.wkb_geometry = wkb_geometry
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=pool_maxsize, pool_block=True,
+            max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504], raise_on_status=False))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # Offer every encoding urllib3 can decode here, e.g. brotli if installed
+        self.session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+
+    def _url(self, endpoint:str) -> str:
+        """
+        The full url of an endpoint of the service, built only once per endpoint
+        """
+        url = self._urls.get(endpoint)
+        if url is None:
+            url = self._urls[endpoint] = f'{self.base_url}/{endpoint}'
+        return url
+
+    def _ensure_dir(self, directory:str) -> None:
+        """
+        Creates the directory, if this client has not already done so
+        """
+        if directory not in self._known_dirs:
+            os.makedirs(directory, exist_ok=True)
+            self._known_dirs.add(directory)
+
+    def _json_body(self, payload, headers:Optional[dict] = None) -> dict:
+        """
+        Serializes the payload with `orjson` into keyword arguments for sending it as the JSON body of a request
+
+        Parameters
+        ----------
+        payload: `JSON / dict`
+            The data to be sent
+        headers: `Optional[dict]`
+            Additional headers to be sent along with the body
+
+        Returns
+        -------
+        `dict`
+            The body and headers to be passed on to the request
+        """
+        body = orjson.dumps(payload)
+        body_headers = {'Content-Type': 'application/json'}
+        if self.compress_requests and len(body) > self.COMPRESSION_THRESHOLD:
+            body = gzip.compress(body, compresslevel=5)
+            body_headers['Content-Encoding'] = 'gzip'
+        return {
+            'data': body,
+            'headers': {**body_headers, **(headers or {})}
+        }
+
+    def _geometry_field(self, name:str, geometry) -> Tuple[str, Union[str, List[str]]]:
+        """
+        The parameter name and value under which a geometry or a list of geometries is sent to the service,
+        as wkb in `<name>_wkb` if `wkb_geometry` is enabled and otherwise as wkt in `<name>`
+        """
+        if self.wkb_geometry:
+            name, encoded = f'{name}_wkb', shapely.to_wkb(geometry, hex=True)
+        else:
+            encoded = shapely.to_wkt(geometry, rounding_precision=-1)
+        return name, encoded.tolist() if isinstance(encoded, np.ndarray) else encoded
+
+    def _accept_arrow(self) -> dict:
+        """
+        Headers that ask the service to respond with an Arrow IPC stream, if `pyarrow` is available,
+        while still accepting JSON
+        """
+        if pa is None:
+            return {}
+        return {'Accept': f'{self.ARROW_STREAM}, application/json;q=0.5'}
+
+    def _is_arrow(self, response:requests.Response) -> bool:
+        """
+        Whether the service responded with an Arrow IPC stream
         """
-        self.base_url = f"http://{ip_address}:{port}"
\ No newline at end of file
+        return response.headers.get('Content-Type', '').startswith(self.ARROW_STREAM)
+
+    def _read_arrow(self, response:requests.Response) -> 'pa.Table':
+        """
+        Reads the Arrow IPC stream of a streamed response directly from the connection
+        """
+        response.raw.decode_content = True
+        return pa.ipc.open_stream(response.raw).read_all()
+
+    def _read_arrow_features(self, response:requests.Response) -> gpd.GeoDataFrame:
+        """
+        Reads the Arrow IPC stream of a streamed response, whose 'geometry' column is encoded as
+        well-known binary (wkb), into a GeoDataFrame
+
+        The CRS is taken from the 'crs' entry of the schema metadata, if present.
+        """
+        table = self._read_arrow(response)
+        geometry = shapely.from_wkb(table.column('geometry').to_numpy())
+        metadata = table.schema.metadata or {}
+        crs = metadata.get(b'crs')
+        attributes = table.select([name for name in table.column_names if name != 'geometry'])
+        return gpd.GeoDataFrame(attributes.to_pandas(), geometry=geometry,
+            crs=crs.decode() if crs is not None else None)
+
+    def _read_features(self, response:requests.Response) -> gpd.GeoDataFrame:
+        """
+        Reads the GeoJSON feature collection of a response into a GeoDataFrame
+
+        If `pyogrio` is installed, the raw bytes are handed to GDAL directly,
+        otherwise the features are built from the parsed JSON.
+        Both give the same frame - the geometry first, followed by the properties, and no CRS.
+        """
+        if pyogrio is None:
+            return gpd.GeoDataFrame.from_features(orjson.loads(response.content)['features'])
+        data = pyogrio.read_dataframe(io.BytesIO(response.content), DATE_AS_STRING='YES')
+        # GDAL exposes string ids of the features as a column and types integers by their range
+        attributes = data.drop(columns=[data.geometry.name, 'id'], errors='ignore')
+        attributes = attributes.astype({name: 'int64' for name, dtype in attributes.dtypes.items() if dtype == 'int32'})
+        features = gpd.GeoDataFrame(attributes, geometry=np.asarray(data.geometry))
+        return features[['geometry', *attributes.columns]]
+
+    def close(self) -> None:
+        """
+        Closes all connections that are kept alive by this client
+        """
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -1,3 +1,4 @@
 from .metar import *
+from .metar_row import MetarRow
 from .credentials import Credentials
 from .status import QueryStates
\ No newline at end of file
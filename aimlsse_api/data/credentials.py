@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 
-@dataclass
+@dataclass(slots=True)
 class Credentials:
     username: str
     password: str
\ No newline at end of file
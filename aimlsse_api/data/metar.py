@@ -1,3 +1,4 @@
+import dataclasses
 import logging
 from dataclasses import dataclass
 from enum import Enum
@@ -5,8 +6,11 @@ from typing import List, Optional
 
 import numpy as np
 import pandas as pd
-from dacite import from_dict
 
+try:
+    _STRING_DTYPE = pd.StringDtype('pyarrow')
+except ImportError:
+    _STRING_DTYPE = pd.StringDtype()
 
 class UnitEnum(str, Enum):
     pass
@@ -41,13 +45,21 @@ class UnitTemperature(UnitEnum):
 
 UnitType = Optional[UnitEnum]
 
-@dataclass
+_DEFAULT_UNIT = {
+    UnitDistance:       UnitDistance.METERS,
+    UnitPrecipitation:  UnitPrecipitation.CENTIMETERS,
+    UnitPressure:       UnitPressure.HECTOPASCAL,
+    UnitSpeed:          UnitSpeed.KILOMETERS_PER_HOUR,
+    UnitTemperature:    UnitTemperature.CELSIUS
+}
+
+@dataclass(slots=True)
 class DataRunwayVisibility:
     runway:         Optional[str]
     lowest_value:   Optional[float]
     highest_value:  Optional[float]
 
-@dataclass
+@dataclass(slots=True)
 class DataWeather:
     intensity:      Optional[str]
     description:    Optional[str]
@@ -55,7 +67,7 @@ class DataWeather:
     obscuration:    Optional[str]
     other:          Optional[str]
 
-@dataclass
+@dataclass(slots=True)
 class DataSkyConditions:
     cover:  Optional[str]
     height: Optional[float]
@@ -136,16 +148,25 @@ class MetarPropertyType(Enum):
             MetarPropertyType.SKY_CONDITIONS
         ]
 
+_DATACLASS_PROPS = frozenset(MetarPropertyType.get_values_with_dataclass())
+
+# Units of different types share names and values (e.g. INCHES), so their class is part of the key
+_VALID_UNITS = frozenset(
+    (property_type, unit.__class__, unit)
+    for property_type in MetarPropertyType if property_type.get_unit_type() is not None
+    for unit in property_type.get_unit_type()
+)
+
 class MetarProperty():
+    logger = logging.getLogger(f'{__name__}.MetarProperty')
     type: MetarPropertyType
     unit: Optional[UnitEnum] = None
 
     def __init__(self, type:MetarPropertyType, unit:Optional[UnitEnum] = None) -> None:
-        self.logger = logging.getLogger(f'{__name__}.{self.__class__.__name__}')
         self.type = type
         expected_type = type.get_unit_type()
         if unit is not None:
-            if (expected_type is None) or (not isinstance(unit, type.get_unit_type())):
+            if (type, unit.__class__, unit) not in _VALID_UNITS:
                 raise ValueError(f'Property {type.name} may not be expressed in the unit {unit.name}, expected type {expected_type} for unit.')
             self.unit = unit
         else:
@@ -153,17 +174,7 @@ class MetarProperty():
                 self.unit = None
             else:
                 # Change missing type to something appropriate
-                if expected_type is UnitDistance:
-                    self.unit = UnitDistance.METERS
-                elif expected_type is UnitPrecipitation:
-                    self.unit = UnitPrecipitation.CENTIMETERS
-                elif expected_type is UnitPressure:
-                    self.unit = UnitPressure.HECTOPASCAL
-                elif expected_type is UnitSpeed:
-                    self.unit = UnitSpeed.KILOMETERS_PER_HOUR
-                elif expected_type is UnitTemperature:
-                    self.unit = UnitTemperature.CELSIUS
-                
+                self.unit = _DEFAULT_UNIT.get(expected_type)
                 self.logger.warning(f'Property {type.name} was not supplied with a unit, eventhough {expected_type} was expected. '
                     f'Automatically set type to {self.unit.name}.')
 
@@ -188,17 +199,32 @@ class MetarPandas:
 
     @staticmethod
     def format_dataframe(data:pd.DataFrame, properties:List[MetarProperty]):
-        data = data.infer_objects()
-        types_with_dataclass = MetarPropertyType.get_values_with_dataclass()
+        numeric_columns = []
+        datetime_columns = []
         retyping_dict = {}
         for prop in properties:
             column_name = str(prop)
-            if prop.type in types_with_dataclass:
-                # Build dataclass from dict
+            if prop.type in _DATACLASS_PROPS:
+                # Build dataclass from dict, missing entries are treated as None
                 dataclass_type = prop.type.get_value_type()
-                data[column_name] = data[column_name].apply(lambda x: [from_dict(dataclass_type, entry) for entry in x])
+                field_names = [field.name for field in dataclasses.fields(dataclass_type)]
+                data[column_name] = data[column_name].apply(
+                    lambda x: [dataclass_type(*[entry.get(name) for name in field_names]) for entry in x])
             elif prop.type != MetarPropertyType.RUNWAY_WINDSHEAR:
                 # Specify type of column
-                retyping_dict[column_name] = prop.type.get_value_type()
+                value_type = prop.type.get_value_type()
+                if value_type is float:
+                    numeric_columns.append(column_name)
+                elif value_type is np.datetime64:
+                    datetime_columns.append(column_name)
+                elif value_type in (str, Optional[str]):
+                    retyping_dict[column_name] = _STRING_DTYPE
+                else:
+                    retyping_dict[column_name] = value_type
+        if numeric_columns:
+            # Single precision suffices for the values of METARs, unparsable values become NaN
+            data[numeric_columns] = data[numeric_columns].apply(pd.to_numeric, downcast='float', errors='coerce')
+        if datetime_columns:
+            data[datetime_columns] = data[datetime_columns].apply(pd.to_datetime)
         data = data.astype(retyping_dict)
         return data
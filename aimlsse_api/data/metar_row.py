@@ -0,0 +1,57 @@
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Optional
+
+from aimlsse_api.util.time import from_millis
+
+from .metar import MetarProperty
+
+@dataclass(slots=True)
+class MetarRow:
+    '''A row of METAR data, whose values are in the order of the requested properties'''
+    station: str
+    datetime: int
+    '''UTC milliseconds since the Unix epoch'''
+    values: List[Any]
+
+    @staticmethod
+    def to_table(rows:Iterable['MetarRow'], properties:List[MetarProperty]) -> dict:
+        """
+        Arranges the rows in the 'table' orientation of pandas, which is the JSON response of `queryMetar`
+        that `aimlsse_api.client.GroundDataClient` reads - encode the result with `orjson.dumps`
+
+        Parameters
+        ----------
+        rows: `Iterable[MetarRow]`
+            The rows of METAR data
+        properties: `List[MetarProperty]`
+            The requested properties, in the order of the values of the rows
+
+        Returns
+        -------
+        `dict`
+            The table schema and the data of the rows
+        """
+        columns = [str(prop) for prop in properties]
+        fields = [
+            {'name': 'station', 'type': 'string'},
+            {'name': 'datetime', 'type': 'datetime', 'tz': 'UTC'}
+        ] + [{'name': column, 'type': _field_type(prop)} for column, prop in zip(columns, properties)]
+        data = []
+        for row in rows:
+            record = dict(zip(columns, row.values))
+            record['station'] = row.station
+            record['datetime'] = from_millis(row.datetime).isoformat(timespec='milliseconds')
+            data.append(record)
+        return {
+            'schema': {'fields': fields},
+            'data': data
+        }
+
+def _field_type(prop:MetarProperty) -> str:
+    value_type = prop.type.get_value_type()
+    if value_type is float:
+        return 'number'
+    if value_type in (str, Optional[str]):
+        return 'string'
+    # Retyped by the client
+    return 'any'
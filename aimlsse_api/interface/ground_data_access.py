@@ -1,16 +1,34 @@
-import datetime
 from abc import ABC, abstractmethod
-from datetime import date
-from typing import List, Union
+from typing import List, Optional, Union
 
 from aimlsse_api.data.metar import MetarProperty
 
 
 class GroundDataAccess(ABC):
-    """Provides access to station data of the ground-measurements data-source"""
+    """
+    Provides access to station data of the ground-measurements data-source
+
+    Transport
+    ---------
+    Services should support keep-alive connections, which the clients of `aimlsse_api.client` pool
+    and reuse over HTTP/1.1, since they reach the service by a plain `http://` url.
+    Services may also serve HTTP/2, so that asynchronous clients can call methods concurrently over
+    a single multiplexed connection - either over TLS, negotiated by ALPN, e.g. with
+    `hypercorn --certfile cert.pem --keyfile key.pem module:app` and `httpx.AsyncClient(http2=True)`,
+    or as h2c with prior knowledge, e.g. with `hypercorn module:app` and `httpx.AsyncClient(http1=False, http2=True)`.
+
+    `application/JSON` responses should be compressed according to the `Accept-Encoding` of the client,
+    preferring `zstd` and falling back to `gzip`, for bodies of at least 1 KB - e.g. with `zstd-asgi`
+    or FastAPI's `GZipMiddleware(minimum_size=1000)`. Large JSON request bodies may arrive with
+    `Content-Encoding: gzip`.
+
+    JSON should be encoded with `orjson` instead of the standard library, e.g. with
+    `FastAPI(default_response_class=ORJSONResponse)`. Request bodies received as `dict` may be
+    decoded into `msgspec.Struct` models to skip the per-field validation of pydantic.
+    """
 
     @abstractmethod
-    async def queryMetar(self, data:dict, datetime_from:datetime, datetime_to:datetime):
+    async def queryMetar(self, data:dict, datetime_from:int, datetime_to:int, query_id:Optional[str] = None):
         """
         Query data for the specified stations in the interval [datetime_from, datetime_to],
         where the properties are extracted from the METARs.
@@ -26,20 +44,79 @@ class GroundDataAccess(ABC):
                 A list containing all stations that the data should be queried for
         -   polygons: `List[str]` [target]
                 A list of polygons in the form of a well-known text (wkt)
-                that specify the area to search for stations
+                that specify the area to search for stations - the same polygons are commonly reused,
+                so implementations should parse them with `aimlsse_api.util.wkt_to_geom`
+        -   polygons_wkb: `List[str]` [target]
+                A list of polygons in the form of a hex-encoded well-known binary (wkb)
+                that specify the area to search for stations - sent instead of `polygons` by clients
+                that enable `wkb_geometry`
         -   properties: `List[MetarProperty]`
                 The properties to extract from the METARs
         
-        datetime_from: `datetime.datetime`
-            The beginning of the interval to be queried
-        datetime_to: `datetime.datetime`
-            The end of the interval to be queried
+        datetime_from: `int` [ms]
+            The beginning of the interval to be queried in UTC milliseconds since the Unix epoch
+        datetime_to: `int` [ms]
+            The end of the interval to be queried in UTC milliseconds since the Unix epoch
+        query_id: `Optional[str]`
+            An opaque identifier of the query shape, i.e. the requested properties and kinds of targets,
+            which stays the same while the stations, polygons and interval change. Implementations may use it
+            to cache prepared statements of the data source (e.g. `asyncpg`'s `Connection.prepare`)
+            instead of planning the same query again
         
         Returns
         -------
         `application/JSON`
             The METAR data that is queried from the data source for the given datetime-interval
             (station, datetime, ..requested properties..)
+
+            The data is a pandas DataFrame in the 'table' orientation. Implementations that hold the rows as
+            `aimlsse_api.data.MetarRow` can produce it by encoding `MetarRow.to_table(rows, properties)`
+            with `orjson.dumps`. Both still handle every row in Python - for large results, the Arrow encoding
+            below avoids that altogether.
+
+        Encoding
+        --------
+        The data is tabular, so implementations should also offer columnar encodings, chosen by the
+        `Accept` header of the request, with JSON as default:
+        - `application/vnd.apache.arrow.stream`
+            A `pyarrow.Table` written by a `pyarrow.ipc.RecordBatchStreamWriter` - requested by
+            `aimlsse_api.client.GroundDataClient` whenever `pyarrow` is installed
+        - `application/vnd.apache.parquet`
+            The same table written as a Parquet file
+        Numeric properties should be stored as float32 columns and the datetime as a timestamp column,
+        so that clients read the values without any parsing.
+        """
+        pass
+
+    @abstractmethod
+    async def queryMetarBatch(self, requests:List[dict], datetime_from:int, datetime_to:int):
+        """
+        Query data for multiple requests in the interval [datetime_from, datetime_to] at once,
+        where the properties are extracted from the METARs.
+
+        Each request is structured like the data of `queryMetar`, extended by a `batch_id`.
+        Implementations should answer all requests with a single set-oriented query of the data source
+        (e.g. all stations of all requests within the interval) and split the result per request afterwards,
+        instead of running one query per request.
+        
+        Parameters
+        ----------
+        requests: `List[JSON / dict]`
+        -   batch_id: `str`
+                An identifier that is returned along with the data of the request
+        -   ..the data of `queryMetar`..
+        
+        datetime_from: `int` [ms]
+            The beginning of the interval to be queried in UTC milliseconds since the Unix epoch
+        datetime_to: `int` [ms]
+            The end of the interval to be queried in UTC milliseconds since the Unix epoch
+        
+        Returns
+        -------
+        `List[application/JSON]`
+            The METAR data of each request together with its batch_id, in the order of the requests
+            (batch_id, data: (station, datetime, ..requested properties..)) - the data is encoded like
+            the JSON response of `queryMetar`, i.e. a pandas DataFrame in the 'table' orientation
         """
         pass
 
@@ -59,11 +136,24 @@ class GroundDataAccess(ABC):
                 A list containing all stations that the metadata should be queried for
         -   polygons: `List[str]` [target]
                 A list of polygons in the form of a well-known text (wkt)
-                that specify the area to search for stations
+                that specify the area to search for stations - the same polygons are commonly reused,
+                so implementations should parse them with `aimlsse_api.util.wkt_to_geom`
+        -   polygons_wkb: `List[str]` [target]
+                A list of polygons in the form of a hex-encoded well-known binary (wkb)
+                that specify the area to search for stations - sent instead of `polygons` by clients
+                that enable `wkb_geometry`
         
         Returns
         -------
         `application/JSON`
             The metadata for the given stations (latitude in [degrees], longitude in [degrees], elevation in [meters], ..)
+
+        Caching
+        -------
+        The metadata of stations rarely changes. Responses should therefore carry an `ETag` computed from the
+        requested stations and the state of the metadata (e.g. a hash of the sorted station ids and the
+        data version) and `Cache-Control: max-age=86400`. Requests with a matching `If-None-Match` header
+        are answered with `304 Not Modified` and no body. Implementations may keep the metadata
+        in memory, e.g. in a `cachetools.TTLCache` keyed by station id.
         """
         pass
\ No newline at end of file
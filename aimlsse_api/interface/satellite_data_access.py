@@ -1,13 +1,60 @@
-import datetime
+from __future__ import annotations
+
 from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, List
 
-from fastapi.security import HTTPBasicCredentials
+from aimlsse_api.data import Credentials, QueryStates
 
-from aimlsse_api.data import QueryStates
+if TYPE_CHECKING:
+    from fastapi.responses import StreamingResponse
 
 
 class SatelliteDataAccess (ABC):
-    """Provides access to geographical data of the satellite's data-source"""
+    """
+    Provides access to geographical data of the satellite's data-source
+
+    Transport
+    ---------
+    Services should support keep-alive connections, which the clients of `aimlsse_api.client` pool
+    and reuse over HTTP/1.1, since they reach the service by a plain `http://` url.
+    Services may also serve HTTP/2, so that asynchronous clients can call methods concurrently over
+    a single multiplexed connection - either over TLS, negotiated by ALPN, e.g. with
+    `hypercorn --certfile cert.pem --keyfile key.pem module:app` and `httpx.AsyncClient(http2=True)`,
+    or as h2c with prior knowledge, e.g. with `hypercorn module:app` and `httpx.AsyncClient(http1=False, http2=True)`.
+
+    `application/JSON` responses should be compressed according to the `Accept-Encoding` of the client,
+    preferring `zstd` and falling back to `gzip`, for bodies of at least 1 KB - e.g. with `zstd-asgi`
+    or FastAPI's `GZipMiddleware(minimum_size=1000)`. Large JSON request bodies may arrive with
+    `Content-Encoding: gzip`.
+
+    JSON should be encoded with `orjson` instead of the standard library, e.g. with
+    `FastAPI(default_response_class=ORJSONResponse)`. Request bodies received as `dict` may be
+    decoded into `msgspec.Struct` models to skip the per-field validation of pydantic.
+    """
+
+    @abstractmethod
+    async def login(self, credentials:Credentials):
+        """
+        Logs in the user with the given credentials for the copernicus hub.
+
+        Returns a token, which the user sends as bearer authorization in the following requests instead of the
+        credentials. Implementations should keep the authenticated upstream session per token (e.g. in a cache
+        with a time to live), so that the credentials are not validated again for every request.
+        Requests with an unknown or expired token are answered with `401 Unauthorized`.
+        
+        Parameters
+        ----------
+        credentials: `Credentials`
+            The username and password strings - implementations based on FastAPI convert its
+            `HTTPBasicCredentials` with `Credentials(username=creds.username, password=creds.password)`
+        
+        Returns
+        -------
+        `application/JSON`
+            The token of the session
+            (token)
+        """
+        pass
 
     @abstractmethod
     async def queryContainingGeometry(self, locations):
@@ -17,46 +64,106 @@ class SatelliteDataAccess (ABC):
         Parameters
         ----------
         locations: `application/JSON`
-            The geo-spacial positions to find the geometry for, that they are contained in
+            The geo-spacial positions to find the geometry for, that they are contained in - either as GeoJSON
+            or as `{"encoding": "wkb_hex", "values": [...]}`, which implementations should decode with
+            `aimlsse_api.util.decode_geometries` to avoid parsing text
+        locations: `application/vnd.apache.arrow.stream`
+            Preferably - the positions as an Arrow IPC stream with a 'geometry' column in well-known binary (wkb),
+            as produced by `pyarrow.Table.from_pandas` from the attributes and `shapely.to_wkb(locations.geometry)`,
+            with the CRS in the 'crs' entry of the schema metadata. Implementations read it with
+            `pyarrow.ipc.open_stream(body).read_all()` and `shapely.from_wkb(table.column('geometry').to_numpy())`,
+            so the geometry stays binary end-to-end - `GeoDataFrame.to_arrow` and `from_arrow` only exist
+            from geopandas 1.0 on
         
         Returns
         -------
         `application/JSON`
             The geometry that together contain the provided locations
+        `application/vnd.apache.arrow.stream`
+            Alternatively, if accepted by the client - the geometry as well-known binary (wkb) in a 'geometry' column
+            and the CRS in the 'crs' entry of the schema metadata
         """
         pass
 
     @abstractmethod
-    async def queryProductsMetadata(self, data:dict, datetime_from:datetime, datetime_to:datetime,
-        credentials:HTTPBasicCredentials):
+    async def queryProductsMetadata(self, data:dict, datetime_from:int, datetime_to:int,
+        token:str):
         """
         Query products from the specified datetime-interval [datetime_from, datetime_to]
         
         Products contain metadata, allowing the user to filter before making a download request
+
+        Groups of parameters in the data, where at least one has to be present are annoted by [x].
+        x refers to the group-identifier.
         
         Parameters
         ----------
         data: `JSON / dict`
-        -   footprint: `str`
-                The point or polygon area of interest
-        datetime_from: `datetime.datetime`
-            The beginning of the interval to be queried
-        datetime_to: `datetime.datetime`
-            The end of the interval to be queried
-        credentials: `HTTPBasicCredentials`
-            A pydantic object with username and password strings
+        -   footprint: `str` [target]
+                The point or polygon area of interest in the form of a well-known text (wkt)
+        -   footprint_wkb: `str` [target]
+                The point or polygon area of interest in the form of a hex-encoded well-known binary (wkb)
+                - sent instead of `footprint` by clients that enable `wkb_geometry`
+        -   cell_name: `str` [target]
+                The name of a L1C grid cell
+        datetime_from: `int` [ms]
+            The beginning of the interval to be queried in UTC milliseconds since the Unix epoch
+        datetime_to: `int` [ms]
+            The end of the interval to be queried in UTC milliseconds since the Unix epoch
+        token: `str`
+            The token of the user's session, as returned by `login`
         
         Returns
         -------
         `application/JSON`
-            The products that are queried from the data source for the given datetime-interval
+            The products that are queried from the data source for the given datetime-interval,
+            preferably column-wise as produced by `pandas.DataFrame.to_json(orient='split')`
+        """
+        pass
+
+    @abstractmethod
+    async def queryProductsMetadataBatch(self, footprints:List[dict], datetime_from:int, datetime_to:int,
+        token:str):
+        """
+        Query products for multiple footprints from the specified datetime-interval [datetime_from, datetime_to]
+
+        Implementations should issue a single query to the copernicus hub, combining the footprints
+        with `OR` (e.g. `Intersects(a) OR Intersects(b)`), and assign the products to the footprints afterwards,
+        instead of querying the hub once per footprint.
+
+        Groups of parameters in each footprint, where at least one has to be present are annoted by [x].
+        x refers to the group-identifier.
+        All non-group parameters have to be present.
+        
+        Parameters
+        ----------
+        footprints: `List[JSON / dict]`
+        -   batch_id: `str`
+                An identifier that is returned along with the products of the footprint
+        -   footprint: `str` [target]
+                The point or polygon area of interest in the form of a well-known text (wkt)
+        -   footprint_wkb: `str` [target]
+                The point or polygon area of interest in the form of a hex-encoded well-known binary (wkb)
+                - sent instead of `footprint` by clients that enable `wkb_geometry`
+        datetime_from: `int` [ms]
+            The beginning of the interval to be queried in UTC milliseconds since the Unix epoch
+        datetime_to: `int` [ms]
+            The end of the interval to be queried in UTC milliseconds since the Unix epoch
+        token: `str`
+            The token of the user's session, as returned by `login`
+        
+        Returns
+        -------
+        `List[application/JSON]`
+            The products of each footprint together with its batch_id, in the order of the footprints
+            (batch_id, products: ..encoded like the response of `queryProductsMetadata`..)
         """
         pass
 
     @abstractmethod
-    async def requestProduct(self, id:str, credentials:HTTPBasicCredentials):
+    async def requestProduct(self, id:str, token:str):
         """
-        Makes a request for the product with the specified id for the user with the given credentials.
+        Makes a request for the product with the specified id for the user of the given token.
 
         Returns the status of the request.
         
@@ -64,8 +171,8 @@ class SatelliteDataAccess (ABC):
         ----------
         id: `str`
             The id of the product to be requested
-        credentials: `HTTPBasicCredentials`
-            A pydantic object with username and password strings
+        token: `str`
+            The token of the user's session, as returned by `login`
         
         Returns
         -------
@@ -73,6 +180,33 @@ class SatelliteDataAccess (ABC):
             The state of the request
         """
         pass
+
+    @abstractmethod
+    async def streamProductState(self, id:str, token:str):
+        """
+        Streams the state of the product with the specified id for the user of the given token,
+        so that clients do not have to poll `requestProduct` until the product is available.
+
+        `requestProduct` remains the call that submits the request. This stream pushes an event whenever the state
+        changes, e.g. `data: {"state": "new"}`, then `"pending"` and `"incomplete"`, until `"available"`.
+        The stream ends after a final state (available, processed, unavailable or invalid), on which clients
+        call `getProduct` once. Requests to the long term archive of the copernicus hub can take hours,
+        so implementations should send comment lines as keep-alive, e.g. by returning an `EventSourceResponse`
+        of `sse-starlette` with a `ping` interval.
+        
+        Parameters
+        ----------
+        id: `str`
+            The id of the product to be observed
+        token: `str`
+            The token of the user's session, as returned by `login`
+        
+        Returns
+        -------
+        `text/event-stream`
+            The server-sent events of the state changes, starting with the current state
+        """
+        pass
     
     @abstractmethod
     async def extractFeatures(self, id:str, radius:float, data:dict):
@@ -99,15 +233,35 @@ class SatelliteDataAccess (ABC):
         -------
         `application/zip`
             The zip-file of the extracted features
+
+        Execution model
+        ---------------
+        Implementations should process the locations by raster tile instead of one after another:
+        translate the locations into pixel coordinates, assign them to the block windows of the band
+        (e.g. `rasterio`'s `block_windows()`) and read each block window only once,
+        extracting all crops that fall into it. This turns one random read per location into a single
+        sequential pass over the affected blocks.
+
+        Implementation notes
+        --------------------
+        Reading the band rasters is I/O-bound when they are not in the page cache. On Linux, implementations
+        may read them through io_uring (e.g. a liburing binding) with `O_DIRECT` for cold reads,
+        registered buffers and large reads split into several batched submissions, so that many reads are
+        in flight from a single thread. This only pays off when the files are not cached already.
         """
         pass
     
     @abstractmethod
-    async def getProduct(self, id:str):
+    async def getProduct(self, id:str) -> StreamingResponse:
         """
         Requests the full product with the specified id.
 
         Returns a zip-file of the product.
+
+        Products are large, so implementations should stream the file instead of loading it into memory,
+        e.g. by yielding chunks of 1 MiB from an async generator that reads the file via `anyio.open_file`.
+        The response should state the `Content-Length` and `Accept-Ranges: bytes`, so that clients
+        can resume interrupted downloads with a `Range` request.
         
         Parameters
         ----------
@@ -117,6 +271,37 @@ class SatelliteDataAccess (ABC):
         Returns
         -------
         `application/zip`
-            The zip-file of the product
+            The zip-file of the product, or the requested range of it (`206 Partial Content`)
+
+        Implementation notes
+        --------------------
+        The streamed chunks may be read through io_uring on Linux, as described for `extractFeatures`.
+        """
+        pass
+
+    @abstractmethod
+    async def getProductRange(self, id:str, offset:int, length:int) -> StreamingResponse:
+        """
+        Requests a range of bytes of the full product with the specified id,
+        e.g. to read a single band file from the zip-file without downloading all of it.
+
+        Returns the bytes in the range [offset, offset + length) of the zip-file of the product.
+        This is equal to a request of `getProduct` with the header `Range: bytes=offset-(offset + length - 1)`.
+        Implementations should read only the requested range, e.g. with a positioned read (`pread`,
+        or an io_uring read at the given offset), and stream it.
+        
+        Parameters
+        ----------
+        id: `str`
+            The id of the product to be requested
+        offset: `int`
+            The position of the first byte in the zip-file
+        length: `int`
+            The number of bytes to be returned
+        
+        Returns
+        -------
+        `application/octet-stream`
+            The bytes of the range, which may be shorter if the zip-file ends before
         """
         pass
@@ -0,0 +1,3 @@
+from .wkt_cache import clear_wkt_cache, wkt_to_geom
+from .geometry import GEOMETRY_ENCODINGS, decode_geometries, decode_geometry
+from .time import from_millis, to_millis
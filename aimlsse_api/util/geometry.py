@@ -0,0 +1,55 @@
+from typing import List
+
+import numpy as np
+import shapely
+from shapely import Geometry
+
+from .wkt_cache import wkt_to_geom
+
+GEOMETRY_ENCODINGS = ('wkb_hex', 'wkb', 'wkt')
+
+def decode_geometry(value, encoding:str) -> Geometry:
+    """
+    Decodes a single geometry, parsing well-known text (wkt) only if no binary encoding is used
+
+    Parameters
+    ----------
+    value: `Union[str, bytes]`
+        The encoded geometry
+    encoding: `str`
+        The encoding of the geometry - one of 'wkb_hex', 'wkb' or 'wkt'
+    
+    Returns
+    -------
+    `shapely.Geometry`
+        The decoded geometry
+    """
+    if encoding == 'wkb_hex' or encoding == 'wkb':
+        return shapely.from_wkb(value)
+    if encoding == 'wkt':
+        return wkt_to_geom(value)
+    raise ValueError(f'Unknown geometry encoding {encoding}, expected one of {GEOMETRY_ENCODINGS}.')
+
+def decode_geometries(values:List, encoding:str) -> np.ndarray:
+    """
+    Decodes multiple geometries at once, see `decode_geometry`
+
+    Binary encodings are decoded in a single call to GEOS.
+    
+    Parameters
+    ----------
+    values: `List[Union[str, bytes]]`
+        The encoded geometries
+    encoding: `str`
+        The encoding of the geometries - one of 'wkb_hex', 'wkb' or 'wkt'
+    
+    Returns
+    -------
+    `numpy.ndarray`
+        The decoded geometries
+    """
+    if encoding == 'wkb_hex' or encoding == 'wkb':
+        return shapely.from_wkb(values)
+    if encoding == 'wkt':
+        return np.array([wkt_to_geom(value) for value in values], dtype=object)
+    raise ValueError(f'Unknown geometry encoding {encoding}, expected one of {GEOMETRY_ENCODINGS}.')
@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta, timezone
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MILLISECOND = timedelta(milliseconds=1)
+
+
+def to_millis(value:datetime) -> int:
+    """
+    Converts a datetime into milliseconds since the Unix epoch, naive datetimes are interpreted as UTC
+
+    Parameters
+    ----------
+    value: `datetime.datetime`
+        The datetime to be converted
+    
+    Returns
+    -------
+    `int`
+        The milliseconds since 1970-01-01T00:00:00Z
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    # Integer arithmetic, since the float of timestamp() may round down by a millisecond
+    return (value - _EPOCH) // _MILLISECOND
+
+def from_millis(value:int) -> datetime:
+    """
+    Converts milliseconds since the Unix epoch into a datetime in UTC
+
+    Parameters
+    ----------
+    value: `int`
+        The milliseconds since 1970-01-01T00:00:00Z
+    
+    Returns
+    -------
+    `datetime.datetime`
+        The timezone-aware datetime in UTC
+    """
+    return _EPOCH + timedelta(milliseconds=value)
@@ -0,0 +1,30 @@
+import functools
+
+import shapely
+from shapely import Geometry
+
+
+@functools.lru_cache(maxsize=4096)
+def wkt_to_geom(wkt:str) -> Geometry:
+    """
+    Parses the geometry of a well-known text (wkt), reusing the results of recently parsed texts
+
+    Geometries are immutable, so a cached geometry may be shared between requests.
+
+    Parameters
+    ----------
+    wkt: `str`
+        The well-known text of the geometry
+    
+    Returns
+    -------
+    `shapely.Geometry`
+        The geometry described by the text
+    """
+    return shapely.from_wkt(wkt)
+
+def clear_wkt_cache() -> None:
+    """
+    Removes all geometries from the cache of `wkt_to_geom`, e.g. to release memory in long-running services
+    """
+    wkt_to_geom.cache_clear()
@@ -0,0 +1,93 @@
+import ipaddress
+from datetime import datetime
+
+import orjson
+import pytest
+import requests
+from shapely import Point
+
+from aimlsse_api.client import GroundDataClient, SatelliteDataClient
+from aimlsse_api.data import Credentials, MetarRow
+from aimlsse_api.data.metar import MetarProperty, MetarPropertyType, UnitTemperature
+
+
+def _respond_with(answer):
+    def send(*args, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.headers['Content-Type'] = 'application/json'
+        response._content = orjson.dumps(answer(orjson.loads(kwargs['data'])))
+        return response
+    return send
+
+@pytest.fixture
+def temperature() -> MetarProperty:
+    return MetarProperty(MetarPropertyType.TEMPERATURE, UnitTemperature.CELSIUS)
+
+def _metar_batches(requests_in, properties):
+    return [{
+        'batch_id': request['batch_id'],
+        'data': MetarRow.to_table([MetarRow(station, 1672531200000, [1.5]) for station in request['stations']],
+            properties)
+    } for request in requests_in]
+
+def test_query_metar_batch_splits_by_batch_id(temperature):
+    client = GroundDataClient(ipaddress.ip_address('127.0.0.1'), 8000)
+    client.session.post = _respond_with(lambda requests_in: _metar_batches(requests_in[::-1], [temperature]))
+    queries = [
+        {'datetime_from': datetime(2023, 1, 1), 'datetime_to': datetime(2023, 1, 2), 'properties': [temperature],
+            'stations': stations}
+        for stations in (['EDDF'], ['EDDH', 'EDDM'])
+    ]
+
+    results = client.queryMetarBatch(queries)
+
+    assert [list(data['station']) for data in results] == [['EDDF'], ['EDDH', 'EDDM']]
+    assert list(results[1]['temperature [C]']) == [1.5, 1.5]
+
+@pytest.mark.parametrize('answer', [
+    lambda batches: batches[:1],
+    lambda batches: batches + [{**batches[0], 'batch_id': '7'}]
+])
+def test_query_metar_batch_raises_for_unanswered_or_unknown_batch_ids(temperature, answer):
+    client = GroundDataClient(ipaddress.ip_address('127.0.0.1'), 8000)
+    client.session.post = _respond_with(lambda requests_in: answer(_metar_batches(requests_in, [temperature])))
+    queries = [
+        {'datetime_from': datetime(2023, 1, 1), 'datetime_to': datetime(2023, 1, 2), 'properties': [temperature],
+            'stations': [station]}
+        for station in ('EDDF', 'EDDH')
+    ]
+
+    with pytest.raises(ValueError):
+        client.queryMetarBatch(queries)
+
+def _product_batches(requests_in):
+    return [{
+        'batch_id': request['batch_id'],
+        'products': {'columns': ['footprint'], 'index': [0], 'data': [[request['footprint']]]}
+    } for request in requests_in]
+
+def _satellite_client(answer) -> SatelliteDataClient:
+    client = SatelliteDataClient(ipaddress.ip_address('127.0.0.1'), 8000)
+    client.login = lambda copernicus_login: 'token'
+    client.session.request = _respond_with(answer)
+    return client
+
+def test_query_products_metadata_batch_splits_by_batch_id():
+    client = _satellite_client(lambda requests_in: _product_batches(requests_in[::-1]))
+
+    results = client.queryProductsMetadataBatch(datetime(2023, 1, 1), datetime(2023, 1, 2), Credentials('user', 'pass'),
+        [Point(1, 2), Point(3, 4)])
+
+    assert [list(products['footprint']) for products in results] == [['POINT (1 2)'], ['POINT (3 4)']]
+
+@pytest.mark.parametrize('answer', [
+    lambda batches: batches[1:],
+    lambda batches: batches + [{**batches[0], 'batch_id': '2'}]
+])
+def test_query_products_metadata_batch_raises_for_unanswered_or_unknown_batch_ids(answer):
+    client = _satellite_client(lambda requests_in: answer(_product_batches(requests_in)))
+
+    with pytest.raises(ValueError):
+        client.queryProductsMetadataBatch(datetime(2023, 1, 1), datetime(2023, 1, 2), Credentials('user', 'pass'),
+            [Point(1, 2), Point(3, 4)])
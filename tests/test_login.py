@@ -0,0 +1,59 @@
+import io
+import ipaddress
+import threading
+import time
+
+import requests
+
+from aimlsse_api.client import SatelliteDataClient
+from aimlsse_api.data import Credentials
+from aimlsse_api.data.status import QueryStates
+
+
+class _Service:
+    '''Answers with 401 for every token but the current one'''
+
+    def __init__(self) -> None:
+        self.logins = 0
+        self.token = 'token-0'
+        self.lock = threading.Lock()
+
+    def login(self, copernicus_login:Credentials) -> str:
+        with self.lock:
+            self.logins += 1
+            self.token = f'token-{self.logins}'
+            time.sleep(0.01)
+            return self.token
+
+    def request(self, method, url, auth, **kwargs) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200 if auth.token == self.token else 401
+        response.raw = io.BytesIO()
+        response._content = b'{"state": "pending"}'
+        return response
+
+def _client(service:_Service) -> SatelliteDataClient:
+    client = SatelliteDataClient(ipaddress.ip_address('127.0.0.1'), 8000, pool_maxsize=8)
+    client.login = service.login
+    client.session.request = service.request
+    return client
+
+def test_concurrent_requests_log_in_once():
+    service = _Service()
+
+    states = _client(service).requestProducts(['a'] * 8, Credentials('user', 'pass'))
+
+    assert states == [QueryStates.PENDING] * 8
+    assert service.logins == 1
+
+def test_expired_token_is_renewed_once():
+    service = _Service()
+    client = _client(service)
+    client.requestProduct('a', Credentials('user', 'pass'))
+    # The session of the token expires at the service
+    service.token = 'expired'
+
+    states = client.requestProducts(['a'] * 8, Credentials('user', 'pass'))
+
+    assert states == [QueryStates.PENDING] * 8
+    assert service.logins == 2
@@ -0,0 +1,49 @@
+import ipaddress
+from datetime import datetime, timezone
+
+import numpy as np
+import orjson
+import pandas as pd
+import requests
+
+from aimlsse_api.client import GroundDataClient
+from aimlsse_api.data import MetarRow
+from aimlsse_api.data.metar import MetarProperty, MetarPropertyType, UnitSpeed, UnitTemperature
+
+
+def _respond_with(body:bytes):
+    def post(url, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.headers['Content-Type'] = 'application/json'
+        response._content = body
+        return response
+    return post
+
+def test_to_table_is_read_by_query_metar():
+    properties = [
+        MetarProperty(MetarPropertyType.TEMPERATURE, UnitTemperature.CELSIUS),
+        MetarProperty(MetarPropertyType.WIND_SPEED, UnitSpeed.KNOTS),
+        MetarProperty(MetarPropertyType.METAR_CODE)
+    ]
+    rows = [
+        MetarRow('EDDF', 1672531200000, [1.5, 10.0, 'EDDF 010000Z']),
+        MetarRow('EDDH', 1672531800399, [None, 4.0, 'EDDH 010010Z'])
+    ]
+    body = orjson.dumps(MetarRow.to_table(rows, properties))
+    client = GroundDataClient(ipaddress.ip_address('127.0.0.1'), 8000)
+    client.session.post = _respond_with(body)
+
+    data = client.queryMetar(datetime(2023, 1, 1), datetime(2023, 1, 2), properties, stations=['EDDF', 'EDDH'])
+
+    assert list(data.columns) == ['station', 'datetime', 'temperature [C]', 'wind_speed [KT]', 'metar_code']
+    assert list(data['station']) == ['EDDF', 'EDDH']
+    assert list(data['datetime']) == [
+        pd.Timestamp(datetime(2023, 1, 1, tzinfo=timezone.utc)),
+        pd.Timestamp(datetime(2023, 1, 1, 0, 10, 0, 399000, tzinfo=timezone.utc))
+    ]
+    assert data['temperature [C]'].dtype == np.float32
+    assert data['temperature [C]'].iloc[0] == 1.5
+    assert np.isnan(data['temperature [C]'].iloc[1])
+    assert list(data['wind_speed [KT]']) == [10.0, 4.0]
+    assert list(data['metar_code']) == ['EDDF 010000Z', 'EDDH 010010Z']
@@ -0,0 +1,44 @@
+import ipaddress
+
+import geopandas as gpd
+import pandas as pd
+import pytest
+import requests
+from shapely import Point, Polygon
+
+from aimlsse_api.client import web_client
+from aimlsse_api.client.satellite_data_client import SatelliteDataClient
+
+
+def _response(body:bytes) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['Content-Type'] = 'application/json'
+    response._content = body
+    return response
+
+@pytest.fixture
+def features() -> bytes:
+    # geopandas writes the index as string ids of the features
+    return gpd.GeoDataFrame({
+        'name': ['EDDF', 'EDDH'],
+        'elevation': [111, 16],
+        'latitude': [50.03, None],
+        'since': ['2023-01-01', '2023-01-02']
+    }, geometry=[Point(8.57, 50.03), Polygon([(0, 0), (1, 0), (1, 1)])], crs='EPSG:4326').to_json().encode()
+
+@pytest.mark.parametrize('empty', [False, True])
+def test_read_features_is_independent_of_pyogrio(monkeypatch, features, empty):
+    pytest.importorskip('pyogrio')
+    if empty:
+        features = b'{"type": "FeatureCollection", "features": []}'
+    client = SatelliteDataClient(ipaddress.ip_address('127.0.0.1'), 8000)
+
+    with_pyogrio = client._read_features(_response(features))
+    monkeypatch.setattr(web_client, 'pyogrio', None)
+    without_pyogrio = client._read_features(_response(features))
+
+    assert with_pyogrio.crs is None
+    pd.testing.assert_frame_equal(with_pyogrio, without_pyogrio)
+    if not empty:
+        assert list(with_pyogrio.columns) == ['geometry', 'name', 'elevation', 'latitude', 'since']
@@ -0,0 +1,19 @@
+from datetime import datetime, timedelta, timezone
+
+from aimlsse_api.util.time import from_millis, to_millis
+
+
+def test_to_millis_keeps_sub_second_values():
+    # timestamp() * 1000 yields 1077759568398.9999 for this datetime
+    value = datetime(2004, 2, 26, 1, 39, 28, 399000, tzinfo=timezone.utc)
+    assert to_millis(value) == 1077759568399
+
+def test_to_millis_interprets_naive_datetimes_as_utc():
+    assert to_millis(datetime(2023, 1, 1)) == 1672531200000
+    assert to_millis(datetime(2023, 1, 1, 1, tzinfo=timezone(timedelta(hours=1)))) == 1672531200000
+
+def test_millis_round_trip():
+    start = datetime(2000, 1, 1, tzinfo=timezone.utc)
+    for step in range(0, 10**9, 7919):
+        value = start + timedelta(milliseconds=step * 1237)
+        assert from_millis(to_millis(value)) == value